@@ -33,13 +33,16 @@ from markdown.preprocessors import Preprocessor
 from markdown.blockprocessors import CodeBlockProcessor
 from markdown.extensions.attr_list import get_attrs
 from markdown import util as md_util
+import array
 import functools
 import re
 
 SOH = '\u0001'  # start
 EOT = '\u0004'  # end
 
-PREFIX_CHARS = ('>', ' ', '\t')
+PREFIX_CHARS = frozenset(('>', ' ', '\t'))
+PREFIX_STRIP = '> \t'
+FENCE_TOKENS = ('```', '~~~')
 
 RE_NESTED_FENCE_START = re.compile(
     r'''(?x)
@@ -65,24 +68,51 @@ RE_OPTIONS = re.compile(
     '''
 )
 
-NESTED_FENCE_END = r'%s[ \t]*$'
-
 FENCED_BLOCK_RE = re.compile(
     r'^([\> ]*)%s(%s)%s$' % (
         md_util.HTML_PLACEHOLDER[0],
         md_util.HTML_PLACEHOLDER[1:-1] % r'([0-9]+)',
         md_util.HTML_PLACEHOLDER[-1]
-    )
+    ),
+    re.M
 )
 
+DEDENT = r'(?m)^.{0,%d}'
+DEDENT_CACHE = {}
+
+RE_ESCAPE = re.compile(r'[&<>]')
+ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+
+def _get_dedent(width):
+    """Get the compiled pattern that strips up to `width` characters from the start of each line."""
+
+    pattern = DEDENT_CACHE.get(width)
+    if pattern is None:
+        pattern = re.compile(DEDENT % width)
+        DEDENT_CACHE[width] = pattern
+    return pattern
+
 
 def _escape(txt):
     """Basic html escaping."""
 
-    txt = txt.replace('&', '&amp;')
-    txt = txt.replace('<', '&lt;')
-    txt = txt.replace('>', '&gt;')
-    return txt
+    # Most code has nothing to escape, so avoid building a new string.
+    if RE_ESCAPE.search(txt) is None:
+        return txt
+    return txt.translate(ESCAPE_TABLE)
+
+
+class CodeStashEntry(object):
+    """Original fenced code and the indentation level it was found at."""
+
+    __slots__ = ('code', 'indent_level')
+
+    def __init__(self, code, indent_level):
+        """Initialize."""
+
+        self.code = code
+        self.indent_level = indent_level
 
 
 class CodeStash(object):
@@ -94,21 +124,22 @@ class CodeStash(object):
     block.
     """
 
+    __slots__ = ('stash',)
+
     def __init__(self):
         """Initialize."""
 
         self.stash = {}
 
-    def __len__(self):  # pragma: no cover
+    def __len__(self):
         """Length of stash."""
 
         return len(self.stash)
 
     def get(self, key, default=None):
-        """Get the code from the key."""
+        """Get the `CodeStashEntry` stored under the given HTML stash index."""
 
-        code = self.stash.get(key, default)
-        return code
+        return self.stash.get(key, default)
 
     def remove(self, key):
         """Remove the stashed code."""
@@ -116,9 +147,9 @@ class CodeStash(object):
         del self.stash[key]
 
     def store(self, key, code, indent_level):
-        """Store the code in the stash."""
+        """Store the code in the stash under its HTML stash index."""
 
-        self.stash[key] = (code, indent_level)
+        self.stash[key] = CodeStashEntry(code, indent_level)
 
     def clear_stash(self):
         """Clear the stash."""
@@ -198,6 +229,10 @@ def _validator(language, inputs, options, attrs, md, validator=None):
     return validator(language, inputs, options, attrs, md)
 
 
+DEFAULT_VALIDATOR = functools.partial(_validator, validator=default_validator)
+HIGHLIGHT_VALIDATOR = functools.partial(_validator, validator=highlight_validator)
+
+
 def _formatter(src='', language='', options=None, md=None, class_name="", _fmt=None, **kwargs):
     """Formatter wrapper."""
 
@@ -230,9 +265,12 @@ class SuperFencesCodeExtension(Extension):
         }
         super().__init__(*args, **kwargs)
 
-    def extend_super_fences(self, name, formatter, validator):
+    def extend_super_fences(self, name, formatter, validator=None):
         """Extend SuperFences with the given name, language, and formatter."""
 
+        if validator is None:
+            validator = DEFAULT_VALIDATOR
+
         obj = {
             "name": name,
             "test": functools.partial(_test, test_language=name),
@@ -259,7 +297,7 @@ class SuperFencesCodeExtension(Extension):
                 "name": "superfences",
                 "test": _test,
                 "formatter": None,
-                "validator": functools.partial(_validator, validator=highlight_validator)
+                "validator": HIGHLIGHT_VALIDATOR
             }
         )
 
@@ -342,12 +380,19 @@ class SuperFencesBlockPreprocessor(Preprocessor):
     def normalize_ws(self, text):
         """Normalize whitespace."""
 
-        return text.expandtabs(self.tab_len)
+        return text.expandtabs(self.tab_len) if '\t' in text else text
 
     def rebuild_block(self, lines):
-        """Dedent the fenced block lines."""
+        """Rebuild the fenced block from the already dedented lines."""
+
+        return '\n'.join(lines)
 
-        return '\n'.join([line[self.ws_virtual_len:] for line in lines])
+    def dedent_line(self, ws, content):
+        """Dedent a fenced block line by the fence's indentation."""
+
+        if len(ws) == self.ws_virtual_len:
+            return content
+        return (ws + content)[self.ws_virtual_len:]
 
     def get_hl_settings(self):
         """Check for Highlight extension to get its configurations."""
@@ -399,7 +444,6 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         self.quote_level = 0
         self.code = []
         self.empty_lines = 0
-        self.fence_end = None
         self.options = {}
         self.classes = []
         self.id = ''
@@ -409,14 +453,14 @@ class SuperFencesBlockPreprocessor(Preprocessor):
     def eval_fence(self, ws, content, start, end):
         """Evaluate a normal fence."""
 
-        if (ws + content).strip() == '':
-            # Empty line is okay
+        if content.strip() == '':
+            # Empty line is okay (outside of blockquotes, `ws` is only whitespace)
             self.empty_lines += 1
-            self.code.append(ws + content)
+            self.code.append(self.dedent_line(ws, content))
         elif len(ws) != self.ws_virtual_len and content != '':
             # Not indented enough
             self.clear()
-        elif self.fence_end.match(content) is not None and not content.startswith((' ', '\t')):
+        elif content.rstrip(' \t') == self.fence and not content.startswith((' ', '\t')):
             # End of fence
             try:
                 self.process_nested_block(ws, content, start, end)
@@ -425,7 +469,7 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         else:
             # Content line
             self.empty_lines = 0
-            self.code.append(ws + content)
+            self.code.append(self.dedent_line(ws, content))
 
     def eval_quoted(self, ws, content, quote_level, start, end):
         """Evaluate fence inside a blockquote."""
@@ -436,7 +480,7 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         elif quote_level <= self.quote_level:
             if content == '':
                 # Empty line is okay
-                self.code.append(ws + content)
+                self.code.append(self.dedent_line(ws, content))
                 self.empty_lines += 1
             elif len(ws) < self.ws_len:
                 # Not indented enough
@@ -445,13 +489,13 @@ class SuperFencesBlockPreprocessor(Preprocessor):
                 # Quote levels don't match and we are signified
                 # the end of the block with an empty line
                 self.clear()
-            elif self.fence_end.match(content) is not None:
+            elif content.rstrip(' \t') == self.fence:
                 # End of fence
                 self.process_nested_block(ws, content, start, end)
             else:
                 # Content line
                 self.empty_lines = 0
-                self.code.append(ws + content)
+                self.code.append(self.dedent_line(ws, content))
 
     def process_nested_block(self, ws, content, start, end):
         """Process the contents of the nested block."""
@@ -472,7 +516,14 @@ class SuperFencesBlockPreprocessor(Preprocessor):
             )
 
         if code is not None:
-            self._store(self.normalize_ws('\n'.join(self.code)) + '\n', code, start, end)
+            # Keep the original, indented source in case we need to restore it.
+            # It is only ever restored if indented code blocks are enabled.
+            source = ''
+            if not self.disabled_indented:
+                source = self.normalize_ws(
+                    '\n'.join(self.lines[start + 1:end - 1]) + '\n'
+                )
+            self._store(source, code, start, end)
         self.clear()
 
     def normalize_hl_line(self, number):
@@ -492,18 +543,23 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         return number
 
     def parse_hl_lines(self, hl_lines):
-        """Parse the lines to highlight."""
+        """
+        Parse the lines to highlight.
+
+        Overlapping ranges are only counted once, so repeating
+        a range can't grow the list beyond the number of code lines.
+        """
 
-        lines = []
+        lines = set()
         if hl_lines:
             for entry in hl_lines.split():
                 line_range = [self.normalize_hl_line(e) for e in entry.split('-')]
                 if len(line_range) > 1:
                     if line_range[0] <= line_range[1]:
-                        lines.extend(list(range(line_range[0], line_range[1] + 1)))
+                        lines.update(range(line_range[0], line_range[1] + 1))
                 elif 1 <= line_range[0] <= self.line_count:
-                    lines.extend(line_range)
-        return lines
+                    lines.update(line_range)
+        return sorted(lines)
 
     def parse_line_start(self, linestart):
         """Parse line start."""
@@ -525,8 +581,16 @@ class SuperFencesBlockPreprocessor(Preprocessor):
     def parse_fence_line(self, line):
         """Parse fence line."""
 
+        if '\t' not in line[:self.ws_virtual_len]:
+            # Without tabs, every prefix character is exactly one column wide.
+            prefix = line[:self.ws_virtual_len]
+            ws_len = len(prefix) - len(prefix.lstrip(PREFIX_STRIP))
+            ws = line[:ws_len]
+            return ws, line[ws_len:], ws.count('>')
+
         ws_len = 0
         ws_virtual_len = 0
+        quote_level = 0
         ws = []
         index = 0
         for c in line:
@@ -535,6 +599,8 @@ class SuperFencesBlockPreprocessor(Preprocessor):
             if c not in PREFIX_CHARS:
                 break
             ws_len += 1
+            if c == '>':
+                quote_level += 1
             if c == '\t':
                 tab_size = self.tab_len - (index % self.tab_len)
                 ws_virtual_len += tab_size
@@ -545,24 +611,16 @@ class SuperFencesBlockPreprocessor(Preprocessor):
                 ws.append(c)
             index += tab_size
 
-        return ''.join(ws), line[ws_len:]
+        return ''.join(ws), line[ws_len:], quote_level
 
     def parse_whitespace(self, line):
         """Parse the whitespace (blockquote syntax is counted as well)."""
 
-        self.ws_len = 0
-        self.ws_virtual_len = 0
-        ws = []
-        for c in line:
-            if c not in PREFIX_CHARS:
-                break
-            self.ws_len += 1
-            ws.append(c)
-
-        ws = self.normalize_ws(''.join(ws))
+        self.ws_len = len(line) - len(line.lstrip(PREFIX_STRIP))
+        ws = self.normalize_ws(line[:self.ws_len])
         self.ws_virtual_len = len(ws)
 
-        return ws
+        return ws, ws.count('>')
 
     def parse_options(self, m):
         """Get options."""
@@ -579,19 +637,16 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         self.formatter = None
         values = {}
         if string:
-            for m in RE_OPTIONS.finditer(string):
-                key = m.group('key')
-                value = m.group('value')
-                if value is None:
-                    value = key
-                values[key] = value
+            for key, quot, value in RE_OPTIONS.findall(string):
+                # Without quotes, there is no value, just a flag.
+                values[key] = value if quot else key
 
         # Run per language validator
         for entry in reversed(self.extension.superfences):
             if entry["test"](self.lang):
                 options = {}
                 attrs = {}
-                validator = entry.get("validator", functools.partial(_validator, validator=default_validator))
+                validator = entry.get("validator", DEFAULT_VALIDATOR)
                 try:
                     okay = validator(self.lang, values, options, attrs, self.md)
                 except Exception:
@@ -609,7 +664,10 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         """Handle attribute list."""
 
         okay = False
-        attributes = get_attrs(m.group('attrs').replace('\t', ' ' * self.tab_len))
+        raw_attrs = m.group('attrs')
+        if '\t' in raw_attrs:
+            raw_attrs = raw_attrs.replace('\t', ' ' * self.tab_len)
+        attributes = get_attrs(raw_attrs)
 
         self.options = {}
         self.attrs = {}
@@ -630,7 +688,7 @@ class SuperFencesBlockPreprocessor(Preprocessor):
             if entry["test"](self.lang):
                 options = {}
                 attrs = {}
-                validator = entry.get("validator", functools.partial(_validator, validator=default_validator))
+                validator = entry.get("validator", DEFAULT_VALIDATOR)
                 try:
                     okay = validator(self.lang, values, options, attrs, self.md)
                 except Exception:
@@ -647,17 +705,29 @@ class SuperFencesBlockPreprocessor(Preprocessor):
     def search_nested(self, lines):
         """Search for nested fenced blocks."""
 
-        count = 0
-        for line in lines:
-            # Strip carriage returns if the lines end with them.
-            # This is necessary since we are handling preserved tabs
-            # Before whitespace normalization.
-            line = line.rstrip('\r')
+        # Original lines are used to rebuild the source of fenced blocks we store.
+        self.lines = lines
+
+        # Bind frequently used methods once as this loop runs for every line.
+        parse_whitespace = self.parse_whitespace
+        parse_fence_line = self.parse_fence_line
+        match_fence_start = RE_NESTED_FENCE_START.match
+        eval_quoted = self.eval_quoted
+        eval_fence = self.eval_fence
+
+        for count, line in enumerate(lines):
             if self.fence is None:
-                ws = self.parse_whitespace(line)
+                if '`' not in line and '~' not in line:
+                    # No fence markers, so this can't start a fence.
+                    continue
+
+                ws, quote_level = parse_whitespace(line)
+                if not line.startswith(FENCE_TOKENS, self.ws_len):
+                    # Not a fence, no need to run the full fence pattern.
+                    continue
 
                 # Found the start of a fenced block.
-                m = RE_NESTED_FENCE_START.match(line, self.ws_len)
+                m = match_fence_start(line, self.ws_len)
                 if m is not None:
 
                     # Parse options
@@ -671,10 +741,9 @@ class SuperFencesBlockPreprocessor(Preprocessor):
                         start = count
                         self.first = ws + self.normalize_ws(m.group(0))
                         self.ws = ws
-                        self.quote_level = self.ws.count(">")
+                        self.quote_level = quote_level
                         self.empty_lines = 0
                         self.fence = m.group('fence')
-                        self.fence_end = re.compile(NESTED_FENCE_END % self.fence)
                     else:
                         # Option parsing failed, abandon fence
                         self.clear()
@@ -687,36 +756,53 @@ class SuperFencesBlockPreprocessor(Preprocessor):
                 # - When content lines are inside blockquotes, make sure
                 #   the nested block quote levels make sense according to
                 #   blockquote rules.
-                ws, content = self.parse_fence_line(line)
+                ws, content, quote_level = parse_fence_line(line)
 
                 end = count + 1
-                quote_level = ws.count(">")
 
                 if self.quote_level:
                     # Handle blockquotes
-                    self.eval_quoted(ws, content, quote_level, start, end)
+                    eval_quoted(ws, content, quote_level, start, end)
                 elif quote_level == 0:
                     # Handle all other cases
-                    self.eval_fence(ws, content, start, end)
+                    eval_fence(ws, content, start, end)
                 else:
                     # Looks like we got a blockquote line
                     # when not in a blockquote.
                     self.clear()
 
-            count += 1
-
-        return self.reassemble(lines)
+        # Don't hold on to the document once we are done with it.
+        self.lines = None
 
     def reassemble(self, lines):
         """Reassemble text."""
 
         # Now that we are done iterating the lines,
         # let's replace the original content with the
-        # fenced blocks.
-        while len(self.stack):
-            fenced, start, end = self.stack.pop()
-            lines = lines[:start] + [fenced] + lines[end:]
-        return lines
+        # fenced blocks. Blocks are stacked in document
+        # order, so we can build the result in one pass.
+        if not self.stack:
+            return lines
+
+        new_lines = []
+        index = 0
+        for (ws, code, original, indent_level), start, end in zip(self.stack, self.stack_start, self.stack_end):
+            # Stash all the blocks in one sweep now that scanning is done.
+            # The code stash is keyed by the placeholder's HTML stash index.
+            stash_index = self.md.htmlStash.html_counter
+            placeholder = self.md.htmlStash.store(code)
+            if original is not None:
+                # If an indented block consumes this placeholder,
+                # we can restore the original source
+                self.extension.stash.store(stash_index, original, indent_level)
+            new_lines.extend(lines[index:start])
+            new_lines.append(ws + placeholder)
+            index = end
+        new_lines.extend(lines[index:])
+        del self.stack[:]
+        del self.stack_start[:]
+        del self.stack_end[:]
+        return new_lines
 
     def highlight(self, src="", language="", options=None, md=None, **kwargs):
         """
@@ -801,44 +887,44 @@ class SuperFencesBlockPreprocessor(Preprocessor):
         Store the fenced blocks in the stack to be replaced when done iterating.
 
         Store the original text in case we need to restore if we are too greedy.
+        Nothing is stashed until the blocks are reassembled.
         """
         # Save the fenced blocks to add once we are done iterating the lines
-        placeholder = self.md.htmlStash.store(code)
-        self.stack.append(('%s%s' % (self.ws, placeholder), start, end))
-        if not self.disabled_indented:
-            # If an indented block consumes this placeholder,
-            # we can restore the original source
-            self.extension.stash.store(
-                placeholder[1:-1],
-                "%s\n%s%s" % (self.first, self.normalize_ws(source), self.last),
-                self.ws_virtual_len
-            )
+        original = None if self.disabled_indented else "%s\n%s%s" % (self.first, source, self.last)
+        self.stack.append((self.ws, code, original, self.ws_virtual_len))
+        self.stack_start.append(start)
+        self.stack_end.append(end)
 
     def reindent(self, text, pos, level):
         """Reindent the code to where it is supposed to be."""
 
-        indented = []
-        for line in text.split('\n'):
-            index = pos - level
-            indented.append(line[index:])
-        return indented
+        index = pos - level
+        if index == 0:
+            return text.split('\n')
+        return [line[index:] for line in text.split('\n')]
 
     def restore_raw_text(self, lines):
         """Revert a prematurely converted fenced block."""
 
+        if not self.extension.stash:
+            return lines
+
+        match_placeholder = FENCED_BLOCK_RE.match
+        stx = md_util.HTML_PLACEHOLDER[0]
+        stash_get = self.extension.stash.get
+        stash_remove = self.extension.stash.remove
         new_lines = []
         for line in lines:
-            m = FENCED_BLOCK_RE.match(line)
+            m = match_placeholder(line) if stx in line else None
             if m:
-                key = m.group(2)
+                key = int(m.group(3))
                 indent_level = len(m.group(1))
-                original = None
-                original, pos = self.extension.stash.get(key, (None, None))
-                if original is not None:
-                    code = self.reindent(original, pos, indent_level)
+                entry = stash_get(key)
+                if entry is not None:
+                    code = self.reindent(entry.code, entry.indent_level, indent_level)
                     new_lines.extend(code)
-                    self.extension.stash.remove(key)
-                if original is None:  # pragma: no cover
+                    stash_remove(key)
+                else:  # pragma: no cover
                     # Too much work to test this. This is just a fall back in case
                     # we find a placeholder, and we went to revert it and it wasn't in our stash.
                     # Most likely this would be caused by someone else. We just want to put it
@@ -854,18 +940,27 @@ class SuperFencesBlockPreprocessor(Preprocessor):
 
         self.get_hl_settings()
         self.clear()
+        # Line spans are kept apart from the block details in compact integer arrays.
         self.stack = []
+        self.stack_start = array.array('i')
+        self.stack_end = array.array('i')
         self.disabled_indented = self.config.get("disable_indented_code_blocks", False)
         self.preserve_tabs = self.config.get("preserve_tabs", False)
 
         if self.preserve_tabs:
             lines = self.restore_raw_text(lines)
-        return self.search_nested(lines)
+        self.search_nested(lines)
+        return self.reassemble(lines)
 
 
 class SuperFencesRawBlockPreprocessor(SuperFencesBlockPreprocessor):
     """Special class for preserving tabs before normalizing whitespace."""
 
+    def dedent_line(self, ws, content):
+        """Keep the indentation as we only ever store the original source."""
+
+        return ws + content
+
     def process_nested_block(self, ws, content, start, end):
         """Process the contents of the nested block."""
 
@@ -879,27 +974,40 @@ class SuperFencesRawBlockPreprocessor(SuperFencesBlockPreprocessor):
         Store the fenced blocks in the stack to be replaced when done iterating.
 
         Store the original text in case we need to restore if we are too greedy.
+        Nothing is stashed until the blocks are reassembled.
         """
-        # Just get a placeholder, we won't ever actually retrieve this source
-        placeholder = self.md.htmlStash.store('')
-        self.stack.append(('%s%s' % (self.ws, placeholder), start, end))
-        # Here is the source we'll actually retrieve.
-        self.extension.stash.store(
-            placeholder[1:-1],
-            "%s\n%s%s" % (self.first, source, self.last),
-            self.ws_virtual_len
-        )
+        # We won't ever actually retrieve the code, so we only need an empty placeholder
+        self.stack.append((self.ws, '', "%s\n%s%s" % (self.first, source, self.last), self.ws_virtual_len))
+        self.stack_start.append(start)
+        self.stack_end.append(end)
 
     def reassemble(self, lines):
         """Reassemble text."""
 
         # Now that we are done iterating the lines,
         # let's replace the original content with the
-        # fenced blocks.
-        while len(self.stack):
-            fenced, start, end = self.stack.pop()
-            lines = lines[:start] + [fenced.replace(md_util.STX, SOH, 1)[:-1] + EOT] + lines[end:]
-        return lines
+        # fenced blocks. Blocks are stacked in document
+        # order, so we can build the result in one pass.
+        if not self.stack:
+            return lines
+
+        new_lines = []
+        index = 0
+        for (ws, code, original, indent_level), start, end in zip(self.stack, self.stack_start, self.stack_end):
+            # Just get a placeholder, we won't ever actually retrieve this source.
+            stash_index = self.md.htmlStash.html_counter
+            key = self.md.htmlStash.store(code)[1:-1]
+            # Here is the source we'll actually retrieve.
+            self.extension.stash.store(stash_index, original, indent_level)
+            new_lines.extend(lines[index:start])
+            # Frame the key with `SOH` and `EOT` instead of `STX` and `ETX` to survive whitespace normalization.
+            new_lines.append(ws + SOH + key + EOT)
+            index = end
+        new_lines.extend(lines[index:])
+        del self.stack[:]
+        del self.stack_start[:]
+        del self.stack_end[:]
+        return new_lines
 
     def run(self, lines):
         """Search for fenced blocks."""
@@ -907,8 +1015,14 @@ class SuperFencesRawBlockPreprocessor(SuperFencesBlockPreprocessor):
         self.get_hl_settings()
         self.clear()
         self.stack = []
+        self.stack_start = array.array('i')
+        self.stack_end = array.array('i')
         self.disabled_indented = self.config.get("disable_indented_code_blocks", False)
-        return self.search_nested(lines)
+
+        # We run before whitespace normalization, so strip carriage returns once up front
+        # while searching, but reassemble the original lines and let normalization handle them.
+        self.search_nested([line.rstrip('\r') for line in lines])
+        return self.reassemble(lines)
 
 
 class SuperFencesCodeBlockProcessor(CodeBlockProcessor):
@@ -922,37 +1036,48 @@ class SuperFencesCodeBlockProcessor(CodeBlockProcessor):
     def reindent(self, text, pos, level):
         """Reindent the code to where it is supposed to be."""
 
-        indented = []
-        for line in text.split('\n'):
-            index = pos - level
-            indented.append(line[index:])
-        return '\n'.join(indented)
+        # The placeholder was written with the fence's original indentation (`pos`),
+        # and block parsing only ever strips indentation, so `level` shouldn't exceed `pos`.
+        # Never hand a negative width to the dedent pattern.
+        index = pos - level
+        if index <= 0:
+            return text
+        # Strip the extra indentation from every line in one pass.
+        return _get_dedent(index).sub('', text)
 
     def revert_greedy_fences(self, block):
         """Revert a prematurely converted fenced block."""
 
+        if md_util.HTML_PLACEHOLDER[0] not in block:
+            # No placeholders, nothing to revert.
+            return block
+
+        stash_get = self.extension.stash.get
+        stash_remove = self.extension.stash.remove
         new_block = []
-        for line in block.split('\n'):
-            m = FENCED_BLOCK_RE.match(line)
-            if m:
-                key = m.group(2)
-                indent_level = len(m.group(1))
-                original = None
-                original, pos = self.extension.stash.get(key)
-                if original is not None:
-                    code = self.reindent(original, pos, indent_level)
-                    new_block.append(code)
-                    self.extension.stash.remove(key)
-                if original is None:  # pragma: no cover
-                    # Too much work to test this. This is just a fall back in case
-                    # we find a placeholder, and we went to revert it and it wasn't in our stash.
-                    # Most likely this would be caused by someone else. We just want to put it
-                    # back in the block if we can't revert it.  Maybe we can do a more directed
-                    # unit test in the future.
-                    new_block.append(line)
-            else:
-                new_block.append(line)
-        return '\n'.join(new_block)
+        index = 0
+        # Find the placeholder lines in one pass and only splice in the ones we revert.
+        for m in FENCED_BLOCK_RE.finditer(block):
+            key = int(m.group(3))
+            entry = stash_get(key)
+            if entry is None:  # pragma: no cover
+                # Too much work to test this. This is just a fall back in case
+                # we find a placeholder, and we went to revert it and it wasn't in our stash.
+                # Most likely this would be caused by someone else. We just want to leave it
+                # in the block if we can't revert it.  Maybe we can do a more directed
+                # unit test in the future.
+                continue
+            new_block.append(block[index:m.start()])
+            new_block.append(self.reindent(entry.code, entry.indent_level, len(m.group(1))))
+            stash_remove(key)
+            index = m.end()
+
+        if not new_block:  # pragma: no cover
+            # Only placeholders that aren't ours (or were already reverted) were found,
+            # so there is nothing to splice. Same fall back as above.
+            return block
+        new_block.append(block[index:])
+        return ''.join(new_block)
 
     def run(self, parent, blocks):
         """Look for and parse code block."""
@@ -962,7 +1087,8 @@ class SuperFencesCodeBlockProcessor(CodeBlockProcessor):
         if not self.config.get("disable_indented_code_blocks", False):
             handled = CodeBlockProcessor.test(self, parent, blocks[0])
             if handled:
-                if self.config.get("nested", True):
+                if self.config.get("nested", True) and self.extension.stash:
+                    # Only look for fences to revert if we have any stashed.
                     blocks[0] = self.revert_greedy_fences(blocks[0])
                 handled = CodeBlockProcessor.run(self, parent, blocks) is not False
         return handled
@@ -46,6 +46,13 @@ def custom_validator(language, inputs, options, attrs, md):
     return okay
 
 
+def custom_highlight_validator(language, inputs, options, attrs, md):
+    """Custom validator that reads the highlight settings."""
+
+    options['opt'] = md.preprocessors['fenced_code_block'].use_pygments
+    return True
+
+
 class TestHighlightTitle(util.MdCase):
     """Test title cases."""
 
@@ -453,6 +460,13 @@ class TestHighlightLines(util.MdCase):
             True
         )
 
+    def test_highlight_overlapping_range(self):
+        """Test that overlapping highlight ranges only yield each line once."""
+
+        processor = self.md.preprocessors['fenced_code_block']
+        processor.line_count = 3
+        self.assertEqual(processor.parse_hl_lines('1-2 2 1-2 2-3'), [1, 2, 3])
+
     def test_highlight_out_of_range(self):
         """Test highlight ranges."""
 
@@ -933,6 +947,40 @@ class TestSuperFencesCustomDefaultValidator(util.MdCase):
         )
 
 
+class TestSuperFencesCustomValidatorPreserveTabs(util.MdCase):
+    """Test custom validator that reads highlight settings when tabs are preserved."""
+
+    extension = ['pymdownx.superfences']
+    extension_configs = {
+        'pymdownx.superfences': {
+            'preserve_tabs': True,
+            'custom_fences': [
+                {
+                    'name': 'test',
+                    'class': 'test',
+                    'format': custom_format,
+                    'validator': custom_highlight_validator
+                }
+            ]
+        }
+    }
+
+    def test_highlight_settings(self):
+        """Test that the highlight settings are available to the validator."""
+
+        self.check_markdown(
+            '''
+            ```test
+            \ttest
+            ```
+            ''',
+            '''
+            <div lang="test" class_name="class-test", option="True">\ttest</div>
+            ''',
+            True
+        )
+
+
 class TestSuperFencesCustomArithmatex(util.MdCase):
     """Test custom Arithmatex format."""
 